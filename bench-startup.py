@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+  bench-startup.py
+
+  Measures how long ppgen takes to get going, two ways:
+    time to main():   from an already running interpreter until ppgen's main() can be called
+    time to --version: a complete "python3 ppgen.py --version" run, including interpreter startup
+
+  Each is timed through the ppgen.py launcher (ppgencore loaded from cached bytecode) and with
+  ppgencore.py run directly as a script (compiled on every run), which is how ppgen used to start.
+
+  usage: python3 bench-startup.py [runs]    (default 10 runs; the median is reported)
+"""
+
+import os, sys, subprocess
+from statistics import median
+from time import perf_counter
+
+here = os.path.dirname(os.path.realpath(__file__))
+launcher = os.path.join(here, "ppgen.py")
+core = os.path.join(here, "ppgencore.py")
+
+# time from interpreter start-up until main() is available, printed by the child in seconds
+toMainLauncher = ("import sys, time; t0 = time.perf_counter(); sys.path.insert(0, {!r}); import ppgencore; "
+                  "print(time.perf_counter() - t0)").format(here)
+toMainScript = ("import time; t0 = time.perf_counter(); f = open({!r}, encoding='utf-8'); "
+                "exec(compile(f.read(), {!r}, 'exec'), {{'__name__': 'ppgenbench'}}); "
+                "print(time.perf_counter() - t0)").format(core, core)
+
+def toMain(code, runs):
+  return median(float(subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE,
+                                     check=True, universal_newlines=True).stdout)
+                for i in range(runs))
+
+def toVersion(script, runs):
+  times = []
+  for i in range(runs):
+    t0 = perf_counter()
+    subprocess.run([sys.executable, script, "--version"], stdout=subprocess.DEVNULL)
+    times.append(perf_counter() - t0)
+  return median(times)
+
+if __name__ == '__main__':
+  runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+  subprocess.run([sys.executable, launcher, "--version"], stdout=subprocess.DEVNULL) # make sure the bytecode cache exists
+  if sys.flags.dont_write_bytecode:
+    print("note: PYTHONDONTWRITEBYTECODE (or -B) is set, so the launcher cannot use cached bytecode")
+  print("median of {} runs".format(runs))
+  print("  time to main():    {:.3f}s launcher, {:.3f}s script".format(toMain(toMainLauncher, runs),
+                                                                    toMain(toMainScript, runs)))
+  print("  time to --version: {:.3f}s launcher, {:.3f}s script".format(toVersion(launcher, runs),
+                                                                    toVersion(core, runs)))
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+  regression/check.py
+
+  Regression check for ppgen's HTML output. Each name-src.txt in this folder is converted
+  to HTML (anonymously, so there is no timestamp) in a scratch folder, and the result must
+  match name-expected.html byte for byte.
+
+    inline-tags   every inline tag the HTML inline markup rewriter handles; the expected
+                  output was produced before that rewrite (one sweep per line) went in
+
+  usage: python3 regression/check.py [path to ppgen.py]    (default: the ppgen.py above this folder)
+  exits 1 if any output differs, and shows the first differences
+"""
+
+import os, sys, shutil, subprocess, tempfile, difflib
+
+here = os.path.dirname(os.path.realpath(__file__))
+
+def check(ppgen, name):
+  with tempfile.TemporaryDirectory() as work:
+    shutil.copy(os.path.join(here, name + "-src.txt"), work)
+    run = subprocess.run([sys.executable, ppgen, "-i", name + "-src.txt", "-o", "h", "-a", "-ini", "none"],
+                         cwd=work, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    out = os.path.join(work, name + ".html")
+    if run.returncode != 0 or not os.path.isfile(out):
+      print("{}: ppgen failed\n{}".format(name, run.stdout))
+      return False
+    with open(out, encoding="utf-8") as f:
+      got = f.read().splitlines()
+  with open(os.path.join(here, name + "-expected.html"), encoding="utf-8") as f:
+    expected = f.read().splitlines()
+  if got == expected:
+    print("{}: ok".format(name))
+    return True
+  print("{}: output differs".format(name))
+  for line in list(difflib.unified_diff(expected, got, "expected", "ppgen", lineterm=""))[:40]:
+    print("  " + line)
+  return False
+
+if __name__ == '__main__':
+  ppgen = os.path.realpath(sys.argv[1]) if len(sys.argv) > 1 else os.path.join(os.path.dirname(here), "ppgen.py")
+  names = sorted(fn[:-len("-src.txt")] for fn in os.listdir(here) if fn.endswith("-src.txt"))
+  results = [check(ppgen, name) for name in names]
+  sys.exit(0 if all(results) else 1)